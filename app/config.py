@@ -15,7 +15,14 @@ USER_AGENT = "OfflineSEOEngine/1.0"
 CRAWL_CONCURRENCY = 5           # number of concurrent fetches
 CRAWL_MAX_RETRIES = 3           # retry attempts per URL
 CRAWL_RETRY_BACKOFF = 1.5       # seconds to wait between retries
+CRAWL_MAX_BODY_BYTES = 5 * 1024 * 1024  # skip bodies larger than this
+ROBOTS_CACHE_DIR = ".robots_cache"      # set to None to disable the disk cache
+
+INDEX_BULK_CHUNK_SIZE = 500      # docs per Elasticsearch bulk request
+INDEX_BULK_MAX_BYTES = 10 * 1024 * 1024
+INDEX_REQUEST_TIMEOUT = 60       # seconds; bulk requests carry large payloads
+
+CLICK_FLUSH_MAX_EVENTS = 500      # flush the click buffer at this many events
+CLICK_FLUSH_INTERVAL_SECONDS = 1.0  # ...or after this long, whichever first
 
 RANKING_DECAY_PER_HOUR = 0.05
-RECENT_CLICK_DECAY_MULTIPLIER = 0.85
-DECAY_JOB_INTERVAL_SECONDS = 1800
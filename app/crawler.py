@@ -1,11 +1,21 @@
 import asyncio
+import re
 import time
-from urllib.parse import urljoin, urlparse
+from collections import deque
+from urllib.parse import urlparse
 
 import aiohttp
+import xxhash
 from aiohttp import ClientTimeout
-from bs4 import BeautifulSoup
+from yarl import URL
+from bs4 import BeautifulSoup, SoupStrainer
 from loguru import logger
+from pybloom_live import ScalableBloomFilter
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax is preferred but optional; bs4 remains as fallback
+    LexborHTMLParser = None
 
 from .config import (
     SEED_URLS,
@@ -16,11 +26,57 @@ from .config import (
     CRAWL_CONCURRENCY,
     CRAWL_MAX_RETRIES,
     CRAWL_RETRY_BACKOFF,
+    CRAWL_MAX_BODY_BYTES,
 )
 from .robots_manager import RobotsManager
 
+# Restrict bs4 tree construction to <a href> tags only — the rest of the
+# document is never materialized on the fallback path.
+_LINK_STRAINER = SoupStrainer("a", href=True)
+
+# Link schemes (and bare/empty fragments) that can never yield a crawlable
+# page — one compiled C-level match instead of multi-branch startswith.
+_REJECT_LINK_RE = re.compile(
+    r"^\s*(?:mailto:|tel:|javascript:|data:|#|$)", re.IGNORECASE
+)
+
+# Drop tag attributes and digit runs before hashing page bodies so session
+# ids, timestamps and view counters don't defeat near-duplicate detection.
+_TAG_ATTRS_RE = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)[^>]*>")
+_DIGITS_RE = re.compile(r"[0-9]+")
+
+
+def content_digest(html: str) -> int:
+    stripped = _TAG_ATTRS_RE.sub(r"<\1>", html)
+    stripped = _DIGITS_RE.sub("", stripped)
+    return xxhash.xxh3_64(stripped.encode("utf-8", "surrogatepass")).intdigest()
+
 
 class Crawler:
+    # Worker loops read these attributes on every iteration; slots make the
+    # lookups fixed-offset reads and drop the per-instance __dict__.
+    __slots__ = (
+        "seed_urls",
+        "request_timeout",
+        "concurrency",
+        "max_pages",
+        "same_domain_only",
+        "max_retries",
+        "retry_backoff",
+        "max_body_bytes",
+        "visited",
+        "enqueued",
+        "_recent_urls",
+        "_recent_url_set",
+        "content_seen",
+        "pages_crawled",
+        "in_flight",
+        "idle_event",
+        "stop_event",
+        "start_time",
+        "robots_manager",
+    )
+
     def __init__(
         self,
         *,
@@ -31,6 +87,7 @@ class Crawler:
         same_domain_only: bool = CRAWL_SAME_DOMAIN_ONLY,
         max_retries: int = CRAWL_MAX_RETRIES,
         retry_backoff: float = CRAWL_RETRY_BACKOFF,
+        max_body_bytes: int = CRAWL_MAX_BODY_BYTES,
     ):
         self.seed_urls = seed_urls or SEED_URLS
         self.request_timeout = request_timeout
@@ -39,15 +96,23 @@ class Crawler:
         self.same_domain_only = same_domain_only
         self.max_retries = max_retries
         self.retry_backoff = retry_backoff
-
-        self.visited: set[str] = set()
-        self.enqueued: set[str] = set()
+        self.max_body_bytes = max_body_bytes
+
+        # Bloom filters give O(1) bits per URL for frontier dedup instead of
+        # retaining every URL string; a small exact window of recent URLs acts
+        # as a cheap fast path for hot repeats (nav links on every page).
+        self.visited = ScalableBloomFilter(initial_capacity=10_000, error_rate=1e-6)
+        self.enqueued = ScalableBloomFilter(initial_capacity=10_000, error_rate=1e-6)
+        self._recent_urls: deque[str] = deque(maxlen=1024)
+        self._recent_url_set: set[str] = set()
+        self.content_seen = ScalableBloomFilter(initial_capacity=10_000, error_rate=1e-6)
         self.pages_crawled = 0
-        self.url_lock = asyncio.Lock()
-        self.pages_lock = asyncio.Lock()
+        # Completion tracking: count of URLs enqueued but not yet fully
+        # processed. When it hits zero the crawl is idle and can finish.
+        self.in_flight = 0
+        self.idle_event = asyncio.Event()
         self.stop_event = asyncio.Event()
         self.start_time = time.monotonic()
-        self.fetch_semaphore = asyncio.Semaphore(self.concurrency)
         self.robots_manager = RobotsManager(USER_AGENT)
 
     def same_domain(self, base_url: str, new_url: str) -> bool:
@@ -55,38 +120,85 @@ class Crawler:
             return True
         return urlparse(base_url).netloc == urlparse(new_url).netloc
 
-    def normalize_url(self, base: str, link: str | None) -> str | None:
+    @staticmethod
+    def _join(base: URL, link: str | None) -> URL | None:
+        if not link or _REJECT_LINK_RE.match(link):
+            return None
+        # Drop the fragment before parsing — cheaper than rebuilding the
+        # joined URL with with_fragment() afterwards.
+        link = link.partition("#")[0].strip()
         if not link:
             return None
-        link = link.strip()
-        if link.startswith(("mailto:", "tel:", "javascript:")):
+        # yarl joins in C, unlike urljoin/urlparse which allocate
+        # pure-Python ParseResult tuples per link.
+        try:
+            return base.join(URL(link))
+        except ValueError:
             return None
-        full = urljoin(base, link)
-        parsed = urlparse(full)
-        return parsed._replace(fragment="").geturl()
+
+    def normalize_url(self, base: str | URL, link: str | None) -> str | None:
+        if not isinstance(base, URL):
+            base = URL(base)
+        joined = self._join(base, link)
+        return None if joined is None else str(joined)
 
     def extract_links(self, html: str, base_url: str):
-        soup = BeautifulSoup(html, "lxml")
-        for a in soup.find_all("a", href=True):
-            new_url = self.normalize_url(base_url, a["href"])
-            if new_url and self.same_domain(base_url, new_url):
-                yield new_url
+        if LexborHTMLParser is not None:
+            hrefs = (a.attributes.get("href") for a in LexborHTMLParser(html).css("a[href]"))
+        else:
+            soup = BeautifulSoup(html, "lxml", parse_only=_LINK_STRAINER)
+            hrefs = (a["href"] for a in soup.find_all("a", href=True))
+
+        # Hoist everything that is constant for the page out of the per-link
+        # loop: the parsed base, the domain flag, and the base host.
+        # Compare hosts, not .authority — yarl fills in default ports there,
+        # so http→https links on the same host would look cross-domain.
+        base = URL(base_url)
+        same_domain_only = self.same_domain_only
+        base_host = base.host
+        for href in hrefs:
+            joined = self._join(base, href)
+            if joined is None:
+                continue
+            if same_domain_only and joined.host != base_host:
+                continue
+            yield str(joined)
 
     async def fetch(self, session: aiohttp.ClientSession, url: str) -> str:
-        headers = {"User-Agent": USER_AGENT}
+        headers = {
+            "User-Agent": USER_AGENT,
+            # Tell origin servers we only want markup; some will 406 early.
+            "Accept": "text/html,application/xhtml+xml",
+        }
         last_error: Exception | None = None
 
         for attempt in range(1, self.max_retries + 1):
             try:
-                async with self.fetch_semaphore:
-                    logger.info(
-                        f"Fetching: {url} (attempt {attempt}/{self.max_retries})"
-                    )
-                    async with session.get(
-                        url, headers=headers, allow_redirects=True
-                    ) as resp:
-                        resp.raise_for_status()
-                        return await resp.text()
+                logger.info(
+                    f"Fetching: {url} (attempt {attempt}/{self.max_retries})"
+                )
+                async with session.get(
+                    url, headers=headers, allow_redirects=True
+                ) as resp:
+                    resp.raise_for_status()
+
+                    # Short-circuit PDFs/images/downloads before buffering
+                    # the whole body just to throw it away.
+                    ct = resp.content_type or ""
+                    if not ct.startswith(("text/html", "application/xhtml")):
+                        logger.info(f"Skipping non-HTML ({ct or 'unknown'}): {url}")
+                        return ""
+                    if (
+                        resp.content_length is not None
+                        and resp.content_length > self.max_body_bytes
+                    ):
+                        logger.info(
+                            f"Skipping oversized body "
+                            f"({resp.content_length} bytes): {url}"
+                        )
+                        return ""
+
+                    return await resp.text()
             except Exception as ex:
                 last_error = ex
                 logger.warning(f"Error fetching {url} (attempt {attempt}): {ex}")
@@ -95,27 +207,48 @@ class Crawler:
 
         raise last_error or RuntimeError(f"Failed to fetch {url}")
 
-    async def _mark_enqueued(self, url: str) -> bool:
-        async with self.url_lock:
-            if url in self.visited or url in self.enqueued or self.stop_event.is_set():
-                return False
-            self.enqueued.add(url)
-            return True
-
-    async def _mark_visited(self, url: str) -> None:
-        async with self.url_lock:
-            self.visited.add(url)
-
-    async def _increment_pages(self) -> int | None:
-        async with self.pages_lock:
-            if self.pages_crawled >= self.max_pages:
-                self.stop_event.set()
-                return None
+    def _remember_recent(self, url: str) -> None:
+        if len(self._recent_urls) == self._recent_urls.maxlen:
+            self._recent_url_set.discard(self._recent_urls[0])
+        self._recent_urls.append(url)
+        self._recent_url_set.add(url)
+
+    def _mark_enqueued(self, url: str) -> bool:
+        # No lock needed: asyncio runs one coroutine at a time and there is
+        # no await between the membership check and the add below.
+        if (
+            url in self._recent_url_set
+            or url in self.enqueued
+            or url in self.visited
+            or self.stop_event.is_set()
+        ):
+            return False
+        if self.enqueued.add(url):  # add() returns True if already present
+            return False
+        self._remember_recent(url)
+        return True
+
+    def _mark_visited(self, url: str) -> None:
+        self.visited.add(url)
+
+    def _track_enqueue(self, queue: asyncio.Queue[str], url: str) -> None:
+        self.in_flight += 1
+        queue.put_nowait(url)
+
+    def _track_done(self) -> None:
+        self.in_flight -= 1
+        if self.in_flight <= 0:
+            self.idle_event.set()
+
+    def _increment_pages(self) -> int | None:
+        if self.pages_crawled >= self.max_pages:
+            self.stop_event.set()
+            return None
 
-            self.pages_crawled += 1
-            if self.pages_crawled >= self.max_pages:
-                self.stop_event.set()
-            return self.pages_crawled
+        self.pages_crawled += 1
+        if self.pages_crawled >= self.max_pages:
+            self.stop_event.set()
+        return self.pages_crawled
 
     def _log_speed(self) -> None:
         elapsed = time.monotonic() - self.start_time
@@ -148,33 +281,53 @@ class Crawler:
                 if self.stop_event.is_set():
                     continue
 
-                await self.robots_manager.ensure_rules(session, url)
-                if not self.robots_manager.is_allowed(url):
+                # ensure_rules returns the (cached) per-host rules; reuse them
+                # for the allow check and crawl-delay instead of re-resolving
+                # the host twice more per URL.
+                rules = await self.robots_manager.ensure_rules(session, url)
+                if not self.robots_manager.is_allowed(url, rules):
                     logger.info(f"Blocked by robots.txt: {url}")
-                    await self._mark_visited(url)
+                    self._mark_visited(url)
                     continue
 
-                await self.robots_manager.wait_for_crawl_delay(url)
+                await self.robots_manager.wait_for_crawl_delay(url, rules)
 
                 html = await self.fetch(session, url)
-                page_number = await self._increment_pages()
+
+                if not html:  # non-HTML or oversized response
+                    self._mark_visited(url)
+                    continue
+
+                if self.content_seen.add(content_digest(html)):
+                    logger.info(f"Skipping near-duplicate content: {url}")
+                    self._mark_visited(url)
+                    continue
+
+                page_number = self._increment_pages()
                 if page_number is None:
                     continue
 
-                await self._mark_visited(url)
+                self._mark_visited(url)
                 await results.put((url, html))
                 self._log_speed()
 
                 if not self.stop_event.is_set():
-                    for link in self.extract_links(html, url):
-                        if await self._mark_enqueued(link):
-                            await queue.put(link)
+                    # Parse off the event loop so other workers' I/O callbacks
+                    # keep running while this page is being chewed through,
+                    # and dedup within the page before touching shared state.
+                    candidates = await asyncio.to_thread(
+                        set, self.extract_links(html, url)
+                    )
+                    for link in candidates:
+                        if self._mark_enqueued(link):
+                            self._track_enqueue(queue, link)
             except asyncio.CancelledError:
                 break
             except Exception as ex:
                 logger.error(f"Error processing {url}: {ex}")
             finally:
-                queue.task_done()
+                # Exactly one decrement per dequeued URL, on every exit path.
+                self._track_done()
 
     async def crawl(self):
         self.start_time = time.monotonic()
@@ -183,39 +336,78 @@ class Crawler:
         results: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
 
         for seed in self.seed_urls:
-            if await self._mark_enqueued(seed):
-                await queue.put(seed)
+            if self._mark_enqueued(seed):
+                self._track_enqueue(queue, seed)
+
+        if self.in_flight == 0:
+            self.idle_event.set()
 
         timeout = ClientTimeout(total=self.request_timeout)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        # Explicit connector tuning: keepalive + DNS cache matter far more
+        # than raw limits on single-domain crawls, where every fetch hits the
+        # same host and default settings re-resolve and re-handshake.
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency * 4,
+            limit_per_host=self.concurrency,
+            ttl_dns_cache=300,
+            use_dns_cache=True,
+            resolver=aiohttp.AsyncResolver(),
+            keepalive_timeout=30,
+            enable_cleanup_closed=True,
+        )
+        session_headers = {
+            "User-Agent": USER_AGENT,
+            # Let aiohttp's C decompression path handle encoded bodies.
+            "Accept-Encoding": "gzip, deflate, br",
+        }
+        async with aiohttp.ClientSession(
+            timeout=timeout, connector=connector, headers=session_headers
+        ) as session:
             workers = [
                 asyncio.create_task(self.worker(session, queue, results))
                 for _ in range(self.concurrency)
             ]
 
-            queue_join: asyncio.Task[None] | None = None
+            idle_task: asyncio.Task[bool] | None = None
+            get_task: asyncio.Task[tuple[str, str]] | None = None
 
             try:
-                queue_join = asyncio.create_task(queue.join())
+                idle_task = asyncio.create_task(self.idle_event.wait())
                 log_task = asyncio.create_task(self._log_speed_periodically())
 
                 while True:
-                    if queue_join.done() and results.empty():
-                        break
+                    if get_task is None:
+                        get_task = asyncio.create_task(results.get())
+
+                    # Event-driven wakeup: either a result arrives or the
+                    # in-flight counter drains to zero — no polling timeout.
+                    done, _ = await asyncio.wait(
+                        {get_task, idle_task},
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
 
-                    try:
-                        item = await asyncio.wait_for(results.get(), timeout=0.2)
-                    except asyncio.TimeoutError:
+                    if get_task in done:
+                        item = get_task.result()
+                        get_task = None
+                        yield item
                         continue
 
-                    yield item
+                    # Frontier fully processed: drain buffered results, stop.
+                    while not results.empty():
+                        yield results.get_nowait()
+                    break
             finally:
+                if get_task and not get_task.done():
+                    get_task.cancel()
+                    await asyncio.gather(get_task, return_exceptions=True)
+
                 for worker in workers:
                     worker.cancel()
                 await asyncio.gather(*workers, return_exceptions=True)
 
-                if queue_join and not queue_join.done():
-                    queue_join.cancel()
+                if idle_task and not idle_task.done():
+                    idle_task.cancel()
+                    await asyncio.gather(idle_task, return_exceptions=True)
 
                 if log_task:
                     log_task.cancel()
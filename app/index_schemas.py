@@ -1,4 +1,4 @@
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch, Elasticsearch
 
 from .config import CLICK_EVENTS_INDEX, ELASTICSEARCH_INDEX
 
@@ -24,7 +24,9 @@ SEO_INDEX_BODY = {
             "meta_description": {"type": "text"},
             "meta_keywords": {"type": "text"},
             "lang": {"type": "keyword"},
-            "crawled_at": {"type": "date"},
+            # epoch_millis for new docs; date_optional_time keeps old
+            # ISO-formatted documents readable.
+            "crawled_at": {"type": "date", "format": "epoch_millis||date_optional_time"},
             "content_length": {"type": "integer"},
             "clicks_total": {"type": "long"},
             "recent_clicks": {"type": "double"},
@@ -60,8 +62,18 @@ def ensure_indices(es: Elasticsearch) -> None:
         es.indices.create(index=CLICK_EVENTS_INDEX, **CLICK_LOG_INDEX_BODY)
 
 
+async def ensure_indices_async(es: AsyncElasticsearch) -> None:
+    """Async twin of ensure_indices for AsyncElasticsearch clients."""
+    if not await es.indices.exists(index=ELASTICSEARCH_INDEX):
+        await es.indices.create(index=ELASTICSEARCH_INDEX, **SEO_INDEX_BODY)
+
+    if not await es.indices.exists(index=CLICK_EVENTS_INDEX):
+        await es.indices.create(index=CLICK_EVENTS_INDEX, **CLICK_LOG_INDEX_BODY)
+
+
 __all__ = [
     "CLICK_LOG_INDEX_BODY",
     "SEO_INDEX_BODY",
     "ensure_indices",
+    "ensure_indices_async",
 ]
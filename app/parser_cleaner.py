@@ -1,26 +1,56 @@
-from datetime import datetime, timezone
+import functools
+import re
 
-from bs4 import BeautifulSoup
+import lxml.etree
+import lxml.html
 from readability import Document
-
-
-def _extract_meta_tag(soup: BeautifulSoup, names: list[str], props: list[str] | None = None) -> str:
+from selectolax.lexbor import LexborHTMLParser
+
+from .ranking import current_time_ms
+
+# Typical JS/CSS/code patterns, compiled into one alternation so the hot
+# line filter counts matches in C instead of scanning per keyword.
+_CODE_KEYWORDS = (
+    "function ",
+    "var ",
+    "let ",
+    "const ",
+    "=>",
+    "if(",
+    "for(",
+    "while(",
+    "return ",
+    "{",
+    "}",
+    ";",
+    "/*",
+    "*/",
+    ".class",
+    "background:",
+    "color:",
+    "margin:",
+    "padding:",
+)
+_CODE_RE = re.compile("|".join(map(re.escape, _CODE_KEYWORDS)))
+
+# Non-word, non-space characters — the "special character" ratio input.
+_SPECIAL_RE = re.compile(r"[^\w\s]")
+
+# Runs of whitespace, collapsed to single spaces during content assembly.
+_WS_RE = re.compile(r"\s+")
+
+
+def _meta_content(tree: LexborHTMLParser, *selectors: str) -> str:
     """
-    Try multiple <meta> name / property combinations and return the first non-empty content.
+    Try <meta> selectors in priority order and return the first non-empty
+    content — targeted CSS queries instead of scanning every meta tag.
     """
-    # name="...":
-    for name in names:
-        tag = soup.find("meta", attrs={"name": name})
-        if tag and tag.get("content"):
-            return tag["content"].strip()
-
-    # property="...":
-    if props:
-        for prop in props:
-            tag = soup.find("meta", attrs={"property": prop})
-            if tag and tag.get("content"):
-                return tag["content"].strip()
-
+    for selector in selectors:
+        for tag in tree.css(selector):
+            # .attributes builds a fresh dict per access — fetch it once.
+            content = tag.attributes.get("content")
+            if content and content.strip():
+                return content.strip()
     return ""
 
 
@@ -28,47 +58,41 @@ def _looks_like_code_or_css(line: str) -> bool:
     """
     Heuristic to drop lines that are mostly JS/CSS/code instead of human-readable text.
     This is to avoid storing CSS/JS junk inside 'content'.
+
+    Short lines go through an LRU cache: nav/footer snippets, cookie banners
+    and other boilerplate recur on every page of a site, so most of them are
+    answered without re-scanning. Long lines are usually unique content and
+    would only churn the cache, so they bypass it.
     """
+    if len(line) > 200:
+        return _scan_code_or_css(line)
+    return _scan_code_or_css_cached(line)
+
+
+@functools.lru_cache(maxsize=8192)
+def _scan_code_or_css_cached(line: str) -> bool:
+    return _scan_code_or_css(line)
+
+
+def _scan_code_or_css(line: str) -> bool:
     if not line:
         return False
 
+    length = len(line)
+
     # Very long single-line blocks are often minified code
-    if len(line) > 400:
+    if length > 400:
         return True
 
-    # Ratio of special characters to total length
-    special = sum(not c.isalnum() and not c.isspace() for c in line)
-    ratio = special / len(line)
-
-    # If a line has many special chars and is not tiny, treat as code
-    if len(line) > 80 and ratio > 0.35:
+    # Keyword scan first — cheaper than the special-char ratio on the
+    # short-to-medium lines that dominate real pages. Count distinct
+    # keywords, matching the original per-keyword `in` checks: three
+    # semicolons in prose must not read as three code markers.
+    if len(set(_CODE_RE.findall(line))) >= 3:
         return True
 
-    # Typical JS/CSS/code patterns
-    code_keywords = (
-        "function ",
-        "var ",
-        "let ",
-        "const ",
-        "=>",
-        "if(",
-        "for(",
-        "while(",
-        "return ",
-        "{",
-        "}",
-        ";",
-        "/*",
-        "*/",
-        ".class",
-        "background:",
-        "color:",
-        "margin:",
-        "padding:",
-    )
-
-    hits = sum(1 for kw in code_keywords if kw in line)
-    if hits >= 3:
+    # If a line has many special chars and is not tiny, treat as code
+    if length > 80 and len(_SPECIAL_RE.findall(line)) / length > 0.35:
         return True
 
     return False
@@ -82,80 +106,95 @@ def parse_html(url: str, html: str) -> dict:
     - Extracts title, meta description/keywords, H1, headings, canonical URL.
     - Adds a short summary field based on main content.
     """
-    soup = BeautifulSoup(html, "lxml")
+    tree = LexborHTMLParser(html)
 
     # ---- TITLE ----
-    if soup.title and soup.title.string:
-        title = soup.title.string.strip()
+    title_tag = tree.css_first("title")
+    if title_tag is not None and title_tag.text().strip():
+        title = title_tag.text().strip()
     else:
         # Fallback on og:title if present
-        og_title_tag = soup.find("meta", attrs={"property": "og:title"})
-        title = og_title_tag.get("content", "").strip() if og_title_tag else ""
+        title = _meta_content(tree, 'meta[property="og:title"]')
 
     # ---- META DESCRIPTION / KEYWORDS ----
-    meta_desc = _extract_meta_tag(
-        soup,
-        names=["description"],
-        props=["og:description", "twitter:description"],
+    meta_desc = _meta_content(
+        tree,
+        'meta[name="description"]',
+        'meta[property="og:description"]',
+        'meta[property="twitter:description"]',
     )
 
-    meta_keywords = _extract_meta_tag(
-        soup,
-        names=["keywords"],
-        props=None,
-    )
+    meta_keywords = _meta_content(tree, 'meta[name="keywords"]')
 
     # ---- LANGUAGE ----
-    html_tag = soup.find("html")
+    html_tag = tree.css_first("html")
     lang = ""
     if html_tag is not None:
-        lang = html_tag.get("lang", "").strip()
+        lang = (html_tag.attributes.get("lang") or "").strip()
 
     # ---- CANONICAL URL ----
     canonical_url = ""
-    canonical_tag = soup.find("link", rel=lambda x: x and "canonical" in x.lower())
-    if canonical_tag and canonical_tag.get("href"):
-        canonical_url = canonical_tag["href"].strip()
+    for link_tag in tree.css("link[rel]"):
+        attrs = link_tag.attributes
+        rel = attrs.get("rel") or ""
+        href = attrs.get("href")
+        if "canonical" in rel.lower() and href:
+            canonical_url = href.strip()
+            break
 
     # ---- MAIN CONTENT USING READABILITY ----
     doc = Document(html)
-    main_html = doc.summary()
-    main_soup = BeautifulSoup(main_html, "lxml")
-
-    # Remove obvious junk: JS/CSS/etc.
-    for tag_name in ("script", "style", "noscript"):
-        for tag in main_soup.find_all(tag_name):
-            tag.decompose()
-
-    # Remove CSS/JS <link> or similar
-    for tag in main_soup.find_all("link"):
-        tag.decompose()
-
-    # Optionally remove nav/footer/forms to keep core content
-    for tag in main_soup.find_all(["nav", "footer"]):
-        tag.decompose()
-
-    # Get text lines
-    raw_lines = [
-        line.strip()
-        for line in main_soup.get_text(separator="\n").splitlines()
-        if line.strip()
-    ]
-
-    # Filter out lines that look like code, JS, or CSS
-    filtered_lines = [ln for ln in raw_lines if not _looks_like_code_or_css(ln)]
+    # html_partial: get just the article <div> instead of a full wrapped
+    # document — less to serialize on readability's side, less to re-parse.
+    main_html = doc.summary(html_partial=True)
+    try:
+        # lxml re-parses readability's (already small) summary in C — no
+        # Python-level Tag objects like the previous bs4 pass allocated.
+        main_tree = lxml.html.fromstring(main_html)
+    except lxml.etree.ParserError:
+        main_tree = None
+
+    if main_tree is not None:
+        # Remove obvious junk — scripts, styles, CSS/JS <link>s, nav/footer
+        # chrome — in a single C-level pass instead of Python drop_tree loops.
+        lxml.etree.strip_elements(
+            main_tree,
+            "script",
+            "style",
+            "noscript",
+            "link",
+            "nav",
+            "footer",
+            with_tail=False,
+        )
+
+        # Strip, filter and whitespace-collapse each text line in one pass
+        # over itertext(), instead of materializing the full text blob and
+        # re-traversing it twice more to filter and re-join.
+        filtered_lines = []
+        for text in main_tree.itertext():
+            for line in text.splitlines():
+                line = line.strip()
+                if line and not _looks_like_code_or_css(line):
+                    filtered_lines.append(_WS_RE.sub(" ", line))
+    else:
+        filtered_lines = []
 
-    # Join back into one string (space-separated to avoid giant single line)
+    # Join into one string (space-separated to avoid giant single line)
     content = " ".join(filtered_lines)
-    content = " ".join(content.split())  # collapse multiple spaces
 
     # Content length
     content_length = len(content)
 
     # ---- HEADINGS ----
-    h1_tags = [h.get_text(strip=True) for h in soup.find_all("h1")]
-    h2_tags = [h.get_text(strip=True) for h in soup.find_all("h2")]
-    h3_tags = [h.get_text(strip=True) for h in soup.find_all("h3")]
+    # One traversal for all three levels, partitioned by tag, instead of a
+    # full-document query per level.
+    by_tag: dict[str, list[str]] = {"h1": [], "h2": [], "h3": []}
+    for h in tree.css("h1,h2,h3"):
+        by_tag[h.tag].append(h.text().strip())
+    h1_tags = by_tag["h1"]
+    h2_tags = by_tag["h2"]
+    h3_tags = by_tag["h3"]
 
     primary_h1 = h1_tags[0] if h1_tags else ""
 
@@ -181,5 +220,7 @@ def parse_html(url: str, html: str) -> dict:
         "meta_description": meta_desc,
         "meta_keywords": meta_keywords,
         "lang": lang,
-        "crawled_at": datetime.now(timezone.utc).isoformat(),
+        # epoch millis — same clock the ranking module uses, and cheaper to
+        # produce than an isoformat string per page.
+        "crawled_at": current_time_ms(),
     }
@@ -2,11 +2,16 @@ import math
 import time
 from typing import Optional
 
+import numpy as np
+from numba import njit, prange
+
 from .config import RANKING_DECAY_PER_HOUR
 
 
 def current_time_ms() -> int:
-    return int(time.time() * 1000)
+    # time_ns + integer division avoids the float multiply/round of
+    # int(time.time() * 1000).
+    return time.time_ns() // 1_000_000
 
 
 def compute_decay_hours(last_clicked_at_ms: Optional[int], now_ms: Optional[int] = None) -> float:
@@ -27,3 +32,32 @@ def compute_ranking_score(
     decay_hours = compute_decay_hours(last_clicked_at_ms, now_ms)
     decay = decay_hours * decay_per_hour
     return math.log(clicks_total + 1) + (recent_clicks * 0.7) - decay
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def compute_ranking_scores_batch(
+    clicks_total: np.ndarray,
+    recent_clicks: np.ndarray,
+    last_clicked_at_ms: np.ndarray,
+    now_ms: int,
+    decay_per_hour: float = RANKING_DECAY_PER_HOUR,
+) -> np.ndarray:
+    """Vectorized compute_ranking_score over parallel arrays.
+
+    For batched reranking or backfills, calling the scalar version in a
+    Python loop pays interpreter dispatch per document; this JIT-compiled
+    loop runs the same formula across cores with no Python overhead.
+    A last_clicked_at_ms of 0 means "never clicked" and decays nothing,
+    matching the scalar function's handling of None.
+    """
+    n = clicks_total.shape[0]
+    scores = np.empty(n, dtype=np.float64)
+    for i in prange(n):
+        last = last_clicked_at_ms[i]
+        decay_hours = max(0.0, (now_ms - last) / 3_600_000) if last > 0 else 0.0
+        scores[i] = (
+            np.log1p(clicks_total[i])
+            + recent_clicks[i] * 0.7
+            - decay_hours * decay_per_hour
+        )
+    return scores
@@ -1,12 +1,17 @@
 import asyncio
+import functools
+import re
 import time
+from collections import defaultdict
 from dataclasses import dataclass, field
 from urllib.parse import urlparse
 
 import aiohttp
+import diskcache
+import pygtrie
 from loguru import logger
 
-from .config import USER_AGENT
+from .config import ROBOTS_CACHE_DIR, USER_AGENT
 
 
 @dataclass
@@ -14,14 +19,32 @@ class RobotsRules:
     allows: list[str] = field(default_factory=list)
     disallows: list[str] = field(default_factory=list)
     crawl_delay: float | None = None
+    # Lazily built prefix tries: longest-prefix lookup in O(len(path))
+    # regardless of rule count, instead of a startswith scan per rule.
+    _allow_trie: pygtrie.CharTrie | None = field(
+        default=None, repr=False, compare=False
+    )
+    _disallow_trie: pygtrie.CharTrie | None = field(
+        default=None, repr=False, compare=False
+    )
+
+    def _tries(self) -> tuple[pygtrie.CharTrie, pygtrie.CharTrie]:
+        if self._allow_trie is None:
+            self._allow_trie = pygtrie.CharTrie(
+                (rule, len(rule)) for rule in self.allows if rule
+            )
+            self._disallow_trie = pygtrie.CharTrie(
+                (rule, len(rule)) for rule in self.disallows if rule
+            )
+        return self._allow_trie, self._disallow_trie
 
     def is_allowed(self, path: str) -> bool:
-        def longest_prefix_length(path_value: str, patterns: list[str]) -> int:
-            matches = [len(rule) for rule in patterns if rule and path_value.startswith(rule)]
-            return max(matches, default=-1)
+        allow_trie, disallow_trie = self._tries()
 
-        allow_len = longest_prefix_length(path, self.allows)
-        disallow_len = longest_prefix_length(path, self.disallows)
+        allow_step = allow_trie.longest_prefix(path)
+        disallow_step = disallow_trie.longest_prefix(path)
+        allow_len = allow_step.value if allow_step else -1
+        disallow_len = disallow_step.value if disallow_step else -1
 
         if disallow_len == -1:
             return True
@@ -34,72 +57,122 @@ class RobotsRules:
         return True
 
 
+# Cap parsed robots.txt size the way Google does — anything beyond this is
+# ignored rather than fed to the parser.
+_ROBOTS_MAX_BYTES = 500 * 1024
+
+# One C-level pass over the whole file: yields (key, value) per rule line,
+# skipping blanks and stripping comments, with no per-line list allocations.
+_ROBOTS_LINE_RE = re.compile(r"(?im)^[ \t]*([a-z-]+)[ \t]*:[ \t]*([^#\r\n]*)")
+
+# Fast path for well-formed absolute URLs: one C-level match instead of a
+# full urlparse, splitting "scheme://authority" from the rest.
+_URL_SPLIT_RE = re.compile(r"^([a-z][a-z0-9+.-]*://[^/?#]+)([^#]*)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=65536)
+def _split_url(url: str) -> tuple[str, str]:
+    """Split a URL into (scheme://authority, path-with-query) in one pass.
+
+    Every crawled URL goes through is_allowed and wait_for_crawl_delay, each
+    of which previously ran its own urlparse; crawls also re-touch the same
+    URLs repeatedly, so the split is memoized.
+    """
+    match = _URL_SPLIT_RE.match(url)
+    if match is not None:
+        path = match.group(2) or "/"
+        return match.group(1), path
+    parsed = urlparse(url)
+    path = parsed.path or "/"
+    if parsed.query:
+        path = f"{path}?{parsed.query}"
+    return f"{parsed.scheme}://{parsed.netloc}", path
+
+
+# Shared default for hosts without (or before) a parsed robots.txt — avoids
+# allocating a throwaway RobotsRules per is_allowed / crawl-delay check.
+_DEFAULT_RULES = RobotsRules()
+_DISALLOW_ALL_RULES = RobotsRules(disallows=["/"])
+
+# Most robots.txt files collapse to a handful of rule sets (allow-all,
+# common CMS defaults), so share the parsed objects across domains instead
+# of keeping one copy per host. Nothing mutates rules after parsing, and
+# the lazy tries are a pure function of the rules, so sharing is safe.
+_SHARED_RULES: dict[tuple, RobotsRules] = {
+    ((), ("/",), None): _DISALLOW_ALL_RULES,
+}
+
+
+def _canonicalize_rules(rules: RobotsRules) -> RobotsRules:
+    if not rules.allows and not rules.disallows and rules.crawl_delay is None:
+        return _DEFAULT_RULES
+    key = (
+        tuple(sorted(rules.allows)),
+        tuple(sorted(rules.disallows)),
+        rules.crawl_delay,
+    )
+    return _SHARED_RULES.setdefault(key, rules)
+
+
 class RobotsManager:
-    def __init__(self, user_agent: str = USER_AGENT):
+    def __init__(
+        self,
+        user_agent: str = USER_AGENT,
+        cache_dir: str | None = ROBOTS_CACHE_DIR,
+    ):
         self.user_agent = user_agent
         self.rules: dict[str, RobotsRules] = {}
-        self.fetch_locks: dict[str, asyncio.Lock] = {}
-        self.delay_locks: dict[str, asyncio.Lock] = {}
+        self.fetch_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.delay_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
         self.next_allowed: dict[str, float] = {}
+        # Parsed rules survive restarts; conditional GETs revalidate them so
+        # repeat crawls skip both the download and the re-parse on 304s.
+        self.disk_cache: diskcache.Cache | None = (
+            diskcache.Cache(cache_dir) if cache_dir else None
+        )
 
     def _domain_key(self, url: str) -> str:
-        parsed = urlparse(url)
-        return f"{parsed.scheme}://{parsed.netloc}"
+        return _split_url(url)[0]
 
     def _path(self, url: str) -> str:
-        parsed = urlparse(url)
-        path = parsed.path or "/"
-        if parsed.query:
-            path = f"{path}?{parsed.query}"
-        return path
-
-    def _get_lock(self, lock_map: dict[str, asyncio.Lock], key: str) -> asyncio.Lock:
-        if key not in lock_map:
-            lock_map[key] = asyncio.Lock()
-        return lock_map[key]
+        return _split_url(url)[1]
 
     def _parse_robots(self, content: str) -> RobotsRules:
+        if len(content) > _ROBOTS_MAX_BYTES:
+            content = content[:_ROBOTS_MAX_BYTES]
+
         rules_map: dict[str, RobotsRules] = {}
-        current_agents: list[str] = []
+        # Rules objects for the active user-agent block, refreshed only when
+        # a user-agent line changes the block — rule lines then append through
+        # these locals instead of re-hashing rules_map per agent per line.
+        current_rules: list[RobotsRules] = []
         last_key: str | None = None
 
-        for raw_line in content.splitlines():
-            line = raw_line.split("#", 1)[0].strip()
-            if not line or ":" not in line:
-                continue
-
-            key, value = [part.strip() for part in line.split(":", 1)]
-            key_lower = key.lower()
+        for match in _ROBOTS_LINE_RE.finditer(content):
+            key_lower = match.group(1).lower()
+            value = match.group(2).strip()
 
             if key_lower == "user-agent":
-                agent = value
+                agent_rules = rules_map.setdefault(value, RobotsRules())
                 if last_key == "user-agent":
-                    current_agents.append(agent)
+                    current_rules.append(agent_rules)
                 else:
-                    current_agents = [agent]
-                rules_map.setdefault(agent, RobotsRules())
-            elif key_lower in {"allow", "disallow"}:
-                if not current_agents:
-                    continue
-                for agent in current_agents:
-                    rules_map.setdefault(agent, RobotsRules())
-                    target_list = (
-                        rules_map[agent].allows
-                        if key_lower == "allow"
-                        else rules_map[agent].disallows
-                    )
-                    if value:
-                        target_list.append(value)
+                    current_rules = [agent_rules]
+            elif key_lower == "allow":
+                if value:
+                    for rules in current_rules:
+                        rules.allows.append(value)
+            elif key_lower == "disallow":
+                if value:
+                    for rules in current_rules:
+                        rules.disallows.append(value)
             elif key_lower == "crawl-delay":
-                if not current_agents:
-                    continue
                 try:
                     delay = float(value)
                 except ValueError:
                     continue
-                for agent in current_agents:
-                    rules_map.setdefault(agent, RobotsRules())
-                    rules_map[agent].crawl_delay = delay
+                for rules in current_rules:
+                    rules.crawl_delay = delay
 
             last_key = key_lower
 
@@ -108,26 +181,52 @@ class RobotsManager:
             if agent.lower() == user_agent_lower:
                 return parsed_rules
 
-        return rules_map.get("*", RobotsRules())
+        return rules_map.get("*", _DEFAULT_RULES)
 
     async def ensure_rules(self, session: aiohttp.ClientSession, url: str) -> RobotsRules:
         domain = self._domain_key(url)
         if domain in self.rules:
             return self.rules[domain]
 
-        lock = self._get_lock(self.fetch_locks, domain)
+        lock = self.fetch_locks[domain]
         async with lock:
             if domain in self.rules:
                 return self.rules[domain]
 
             robots_url = f"{domain}/robots.txt"
+            cached = self.disk_cache.get(domain) if self.disk_cache is not None else None
+
+            headers: dict[str, str] = {}
+            if cached:
+                if cached.get("etag"):
+                    headers["If-None-Match"] = cached["etag"]
+                if cached.get("last_modified"):
+                    headers["If-Modified-Since"] = cached["last_modified"]
+
             logger.info(f"Fetching robots.txt for {domain}")
             try:
-                async with session.get(robots_url, allow_redirects=True) as resp:
+                async with session.get(
+                    robots_url, allow_redirects=True, headers=headers or None
+                ) as resp:
+                    if resp.status == 304 and cached:
+                        logger.info(f"robots.txt for {domain} unchanged (304); using disk cache")
+                        parsed_rules = _canonicalize_rules(cached["rules"])
+                        self.rules[domain] = parsed_rules
+                        return parsed_rules
                     if resp.status == 200:
                         content = await resp.text()
-                        parsed_rules = self._parse_robots(content)
+                        parsed_rules = _canonicalize_rules(self._parse_robots(content))
                         self.rules[domain] = parsed_rules
+                        if self.disk_cache is not None:
+                            self.disk_cache.set(
+                                domain,
+                                {
+                                    "rules": parsed_rules,
+                                    "etag": resp.headers.get("ETag"),
+                                    "last_modified": resp.headers.get("Last-Modified"),
+                                    "fetched_at": time.time(),
+                                },
+                            )
                         return parsed_rules
                     logger.info(
                         f"robots.txt for {domain} returned status {resp.status}; allowing by default"
@@ -135,23 +234,23 @@ class RobotsManager:
             except Exception as ex:
                 logger.warning(f"Failed to fetch robots.txt for {domain}: {ex}; allowing by default")
 
-            self.rules[domain] = RobotsRules()
-            return self.rules[domain]
+            self.rules[domain] = _DEFAULT_RULES
+            return _DEFAULT_RULES
 
-    def is_allowed(self, url: str) -> bool:
-        domain = self._domain_key(url)
-        rules = self.rules.get(domain, RobotsRules())
-        path = self._path(url)
-        return rules.is_allowed(path)
+    def is_allowed(self, url: str, rules: RobotsRules | None = None) -> bool:
+        if rules is None:
+            rules = self.rules.get(self._domain_key(url), _DEFAULT_RULES)
+        return rules.is_allowed(self._path(url))
 
-    async def wait_for_crawl_delay(self, url: str) -> None:
-        domain = self._domain_key(url)
-        rules = self.rules.get(domain, RobotsRules())
+    async def wait_for_crawl_delay(self, url: str, rules: RobotsRules | None = None) -> None:
+        if rules is None:
+            rules = self.rules.get(self._domain_key(url), _DEFAULT_RULES)
         delay = rules.crawl_delay or 0
         if delay <= 0:
             return
 
-        lock = self._get_lock(self.delay_locks, domain)
+        domain = self._domain_key(url)
+        lock = self.delay_locks[domain]
         async with lock:
             now = time.monotonic()
             next_allowed_time = self.next_allowed.get(domain, now)
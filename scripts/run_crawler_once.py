@@ -1,6 +1,7 @@
 import asyncio
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 # Allow "python scripts/run_crawler_once.py" to find app.*
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -8,24 +9,61 @@ if BASE_DIR not in sys.path:
     sys.path.append(BASE_DIR)
 
 from app.crawler import Crawler
-from app.indexer import Indexer
+from app.indexer import AsyncIndexer
 from app.parser_cleaner import parse_html
 from loguru import logger
 
 
 async def main():
     crawler = Crawler()
-    indexer = Indexer()
+    indexer = AsyncIndexer()
+    await indexer.ensure_ready()
+    loop = asyncio.get_running_loop()
+
+    # parse_html (readability in particular) is pure-Python and GIL-bound, so
+    # a thread pool buys nothing — spread parsing across CPU cores instead.
+    # Cap the in-flight futures so raw HTML for at most ~2 batches of pages
+    # sits in memory while keeping every core fed.
+    max_in_flight = 2 * (os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+
+        async def parsed_docs():
+            pending: dict[asyncio.Future, str] = {}
+
+            async def drain(return_when):
+                done, _ = await asyncio.wait(pending, return_when=return_when)
+                docs = []
+                for fut in done:
+                    url = pending.pop(fut)
+                    try:
+                        doc = fut.result()
+                    except Exception as ex:
+                        logger.error(f"Error processing {url}: {ex}")
+                        continue
+                    if doc["content_length"] < 50:
+                        logger.info(f"Skipping {url} – content too short")
+                        continue
+                    docs.append(doc)
+                return docs
+
+            async for url, html in crawler.crawl():
+                pending[loop.run_in_executor(pool, parse_html, url, html)] = url
+                if len(pending) >= max_in_flight:
+                    for doc in await drain(asyncio.FIRST_COMPLETED):
+                        yield doc
+            while pending:
+                for doc in await drain(asyncio.ALL_COMPLETED):
+                    yield doc
 
-    async for url, html in crawler.crawl():
         try:
-            doc = parse_html(url, html)
-            if doc["content_length"] < 50:
-                logger.info(f"Skipping {url} – content too short")
-                continue
-            indexer.index_document(doc)
-        except Exception as ex:
-            logger.error(f"Error processing {url}: {ex}")
+            indexed = await indexer.stream_index(parsed_docs())
+            # Bulk requests skip per-chunk refreshes; one refresh at the end
+            # makes the whole crawl searchable.
+            await indexer.refresh()
+            logger.info(f"Indexed {indexed} documents")
+        finally:
+            await indexer.close()
 
 
 if __name__ == "__main__":